@@ -1,3 +1,5 @@
+import itertools
+import numpy as np
 from Grid import Grid
 
 #This function converts a decimal integer into another base
@@ -14,26 +16,111 @@ def decToBase(x, base):
 def padNumber(x, length):
     return "0" * (length-len(x)) + x
 
+#Returns the largest number of base k digits which always fit in a 64 bit integer
+def chunk_digits(k):
+    digits = 1
+    while k ** (digits+1) < 2 ** 63:
+        digits += 1
+    return digits
+
+#Returns the rule table of a code as an array, where entry n is the new state for the neighbourhood which reads as n in base k
+#The code's base k digits are worked out arithmetically, a chunk of digits at a time, rather than by building strings
+def get_rule_table(k, r, code, num_neighbourhoods=None):
+    if num_neighbourhoods is None:
+        num_neighbourhoods = k ** (2*r+1)
+    digits = chunk_digits(k)
+    #Split the code into chunks of digits which each fit in 64 bits, lowest first
+    chunks = []
+    while code and len(chunks) * digits < num_neighbourhoods:
+        code, chunk = divmod(code, k ** digits)
+        chunks.append(chunk)
+    #Then split every chunk into its digits at once
+    powers = k ** np.arange(digits, dtype=np.int64)
+    table = ((np.array(chunks, dtype=np.int64)[:, None] // powers) % k).astype(np.uint8).ravel()
+    return np.concatenate((table, np.zeros(max(num_neighbourhoods - len(table), 0), dtype=np.uint8)))[:num_neighbourhoods]
+
+#Returns the rule tables of every code from start up to but not including stop, as an array with a row for each code
+#Consecutive codes share all but their lowest digits, so the lowest digits are worked out together for each block of codes
+#   and the rest are worked out once per block
+def get_rule_tables(k, r, start, stop):
+    num_neighbourhoods = k ** (2*r+1)
+    digits = min(chunk_digits(k), num_neighbourhoods)
+    block = k ** digits
+    powers = k ** np.arange(digits, dtype=np.int64)
+    tables = np.zeros((max(stop - start, 0), num_neighbourhoods), dtype=np.uint8)
+    code = start
+    while code < stop:
+        high, low = divmod(code, block)
+        end = min(stop, (high + 1) * block)
+        lows = np.arange(low, low + end - code, dtype=np.int64)
+        tables[code - start:end - start, :digits] = (lows[:, None] // powers) % k
+        if num_neighbourhoods > digits:
+            tables[code - start:end - start, digits:] = get_rule_table(k, r, high, num_neighbourhoods - digits)
+        code = end
+    return tables
+
 #Class to represent an automaton
 class Automaton:
-    def __init__(self, k, r, code, initial_conditions, max_steps):
+    #engine selects how the spacetime diagram is stored and evolved:
+    #   "string" keeps each step as a string of digits and looks up every cell in next_cell
+    #   "numpy" keeps the steps in a preallocated uint8 array and evolves a whole step at once
+    #   "lightcone" uses the same array as "numpy", but only evolves the window of cells which can differ from the background.
+    #       The cells outside the window are only filled in with the background when they are needed
+    #table can be given if the rule table for the code has already been made, for example by get_rule_tables
+    #If path is given, the "numpy" and "lightcone" engines keep their array in a memory-mapped file at path instead of in memory, with one byte per cell.
+    #   This lets very long runs be evolved and classified without holding every step in memory. Any existing file at path is overwritten
+    def __init__(self, k, r, code, initial_conditions, max_steps, engine="string", table=None, path=None):
+        if engine not in ("string", "numpy", "lightcone"):
+            raise ValueError("Unknown engine " + str(engine))
+        if engine == "string" and path is not None:
+            raise ValueError("The string engine can't be stored in a file")
         #k is number of states, r is radius of neighbourhood
         self.k = k
         self.r = r
+        self.engine = engine
+        self.path = path
         neighbourhood_size = 2*r+1
-        num_neighbourhoods = k ** neighbourhood_size
-        #Use k and r to produce each unique neighbourhood. These are created counting down, to match the order used by Rule notation of elementary automata
-        neighbourhoods = [padNumber(decToBase(x, k), neighbourhood_size) for x in range(num_neighbourhoods-1,-1,-1)]
-        #Convert the decimal integer code into a base k representation
-        code = list(padNumber(str(decToBase(code, k)), num_neighbourhoods))
-        #read off the states and assign each the subsequent digit. The pop method removes the first item, so we can just iterate over the neighbourhoods 
-        self.next_cell = {}
-        for value_in in neighbourhoods:
-            self.next_cell[value_in] = code.pop(0)
+        #The rule as a lookup table indexed by the neighbourhood read as a base k number.
+        #   Rule notation for elementary automata counts the neighbourhoods down, so the last digit of the code is the first entry
+        if table is None:
+            table = get_rule_table(k, r, code)
+        self.table = table
         #Initialise the first step with the initial condition padded with sufficient zeroes
         self.step = "0"*self.r*max_steps + initial_conditions + "0"*self.r*max_steps
-        self.data = [self.step]
+        #time is the number of steps evolved so far
+        self.time = 0
+        if engine == "string":
+            #The string engine looks up each neighbourhood as a string. itertools.product produces the neighbourhoods counting up, the same order as the table
+            neighbourhoods = map("".join, itertools.product("0123456789"[:k], repeat=neighbourhood_size))
+            self.next_cell = dict(zip(neighbourhoods, map(str, self.table.tolist())))
+            self.data = [self.step]
+            return
+        #Every step is written into one array with a row for each step, allocated up front
+        if path is None:
+            self.cells = np.zeros((max_steps+1, len(self.step)), dtype=np.uint8)
+        else:
+            #A new file is filled with zeroes, the same as np.zeros
+            self.cells = np.memmap(path, dtype=np.uint8, mode="w+", shape=(max_steps+1, len(self.step)))
+        self.cells[0] = np.frombuffer(self.step.encode(), dtype=np.uint8) - ord("0")
+        self.step = self.cells[0]
+        self.data = self.cells[:1]
+        if engine == "lightcone":
+            #The index of the neighbourhood made of a single state s is s*uniform_index
+            self.uniform_index = (k ** neighbourhood_size - 1) // (k - 1)
+            #windows holds the (start, end) of the cells of each step which can differ from that step's state in backgrounds.
+            #   An empty window is stored as (0, 0)
+            active = np.flatnonzero(self.cells[0])
+            self.windows = [(int(active[0]), int(active[-1]) + 1) if len(active) else (0, 0)]
+            self.backgrounds = [0]
+            #filled is the number of steps which have had the cells outside their window filled in
+            self.filled = 1
     def process_step(self):
+        if self.engine == "numpy":
+            self.process_array_step()
+            return
+        if self.engine == "lightcone":
+            self.process_window_step()
+            return
         result = ""
         #To maintain a closed system, the display is looped. It's calculated to be wide enough that this won't cause an issue.
         #This requires three separate for loops to ensure the correct index is being checked
@@ -46,8 +133,136 @@ class Automaton:
             result += self.next_cell[self.step[i-2*self.r:] + self.step[:i+1]]
         self.step = result
         self.data.append(self.step)
+        self.time += 1
+    #Applies the rule to every full neighbourhood in segment, returning the new states, which are 2r fewer than the cells in segment
+    #Each neighbourhood is read as a base k number by summing shifted copies of the segment, and the new states are then taken from the lookup table at once
+    def next_segment(self, segment):
+        width = len(segment) - 2*self.r
+        index = segment[:width].astype(np.intp)
+        for i in range(1, 2*self.r+1):
+            index *= self.k
+            index += segment[i:i+width]
+        return self.table[index]
+    #If more steps are requested than were allocated for, double the size of the array
+    def make_space(self):
+        if self.time + 1 == len(self.cells):
+            self.resize(2 * len(self.cells))
+    #Makes the array hold the given number of steps, keeping the steps already in it. The new steps are all zeroes
+    def resize(self, rows):
+        width = self.cells.shape[1]
+        if self.path is None:
+            self.cells = np.concatenate((self.cells, np.zeros((rows - len(self.cells), width), dtype=np.uint8)))
+        else:
+            #The file is extended with zeroes and mapped again. Grids made from the old mapping still see the same steps
+            self.cells.flush()
+            with open(self.path, "r+b") as spacetime:
+                spacetime.truncate(rows * width)
+            self.cells = np.memmap(self.path, dtype=np.uint8, mode="r+", shape=(rows, width))
+        self.data = self.cells[:self.time+1]
+    #Evolves one step of the numpy engine
+    def process_array_step(self):
+        self.make_space()
+        row = self.cells[self.time]
+        width = len(row)
+        #The step is looped in the same way as the string engine, by adding r cells from the opposite side to each end
+        self.cells[self.time+1] = self.next_segment(np.concatenate((row[width-self.r:], row, row[:self.r])))
+        self.time += 1
+        self.step = self.cells[self.time]
+        self.data = self.cells[:self.time+1]
+    #Evolves one step of the lightcone engine
+    #On each step the window can only grow by r cells on each side, and the background outside it evolves as a single uniform state
+    def process_window_step(self):
+        self.make_space()
+        start, end = self.windows[self.time]
+        background = self.backgrounds[self.time]
+        width = self.cells.shape[1]
+        r = self.r
+        next_background = int(self.table[background * self.uniform_index])
+        if start == end:
+            #Every cell is background, so the next step is too
+            pass
+        elif start >= 2*r and end <= width - 2*r:
+            #The window is far enough from the edges that looping has no effect, so only the window and the r cells either side are evolved.
+            #   The cells they depend on outside the window are all background
+            segment = np.full(end - start + 4*r, background, dtype=np.uint8)
+            segment[2*r:2*r + end - start] = self.cells[self.time, start:end]
+            start, end = start - r, end + r
+            self.cells[self.time+1, start:end] = self.next_segment(segment)
+        else:
+            #Once the window reaches the edges, the whole step is evolved in the same way as the numpy engine
+            self.fill_steps(self.time)
+            row = self.cells[self.time]
+            self.cells[self.time+1] = self.next_segment(np.concatenate((row[width-r:], row, row[:r])))
+            start, end = 0, width
+        #Shrink the window to the cells which really differ from the background
+        active = np.flatnonzero(self.cells[self.time+1, start:end] != next_background)
+        if len(active):
+            start, end = start + int(active[0]), start + int(active[-1]) + 1
+        else:
+            start, end = 0, 0
+        self.time += 1
+        self.windows.append((start, end))
+        self.backgrounds.append(next_background)
+        self.step = self.cells[self.time]
+        self.data = self.cells[:self.time+1]
+    #Fills in the background outside the window of every step up to and including the step at time t, for the lightcone engine
+    def fill_steps(self, t):
+        for i in range(self.filled, t+1):
+            #The array starts as zeroes, so there is nothing to fill in when the background is 0
+            if self.backgrounds[i] != 0:
+                start, end = self.windows[i]
+                self.cells[i, :start] = self.backgrounds[i]
+                self.cells[i, end:] = self.backgrounds[i]
+        self.filled = max(self.filled, t+1)
     def process_steps(self, times):
         for i in range(times):
             self.process_step()
+    #Returns the step at time t. For the lightcone engine this fills in the step's background first
+    def get_step(self, t):
+        if self.engine == "lightcone":
+            self.fill_steps(t)
+        return self.data[t]
+    #Generator which evolves the given number of steps, yielding each new step as it is produced
+    def evolve(self, times):
+        for i in range(times):
+            self.process_step()
+            yield self.get_step(self.time)
+    #Returns the step at time t in a form which can be hashed and compared, used to spot when a step repeats an earlier one
+    def get_step_key(self, t):
+        if self.engine == "lightcone":
+            #A step is completely described by its background, its window and the cells inside the window
+            start, end = self.windows[t]
+            return (self.backgrounds[t], start, end, self.cells[t, start:end].tobytes())
+        if self.engine == "numpy":
+            return self.cells[t].tobytes()
+        return self.data[t]
+    #Adds the given number of steps by repeating the cycle of steps from start up to the current step, instead of evolving them
+    #This is only valid when the current step is the same as the step at start, as every step after it must then follow the same cycle
+    def repeat_cycle(self, start, times):
+        period = self.time - start
+        if self.engine == "string":
+            for i in range(times):
+                self.time += 1
+                self.data.append(self.data[start + (self.time - start) % period])
+            self.step = self.data[self.time]
+            return
+        if self.engine == "lightcone":
+            #The steps being copied need their background filled in first, and the copies then don't need filling
+            self.fill_steps(self.time)
+            for i in range(self.time + 1, self.time + times + 1):
+                self.windows.append(self.windows[start + (i - start) % period])
+                self.backgrounds.append(self.backgrounds[start + (i - start) % period])
+            self.filled = self.time + times + 1
+        if self.time + times >= len(self.cells):
+            self.resize(self.time + times + 1)
+        #Every new step is a copy of the step in the same position of the cycle
+        positions = start + (np.arange(self.time + 1, self.time + times + 1) - start) % period
+        self.cells[self.time + 1:self.time + times + 1] = self.cells[positions]
+        self.time += times
+        self.step = self.cells[self.time]
+        self.data = self.cells[:self.time+1]
     def get_grid(self):
+        if self.engine == "lightcone":
+            self.fill_steps(self.time)
+        #The array engines pass their array straight to the Grid without copying
         return Grid(self.k, self.data)
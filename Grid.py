@@ -1,14 +1,23 @@
-import pygame
+from collections import deque
+import numpy as np
 
 #Grid object used to analyse and display the results of an automaton
 class Grid:
     def __init__(self, k, data):
-        #Input data is a nested list (technically a list of strings, but strings are lists of characters in Python, and the Grid object treats it like an ordinary list)
-        self.data = data
+        #Input data is either a 2D uint8 array of states, or a list of strings of digits with one string per step
+        #The states are always stored as an array, with a row for each step. Arrays are used as they are, so slices of another grid share its memory,
+        #   and a grid made from a memory-mapped array (see Automaton) reads its cells from the file without copying them
+        if isinstance(data, np.ndarray):
+            self.data = data
+        else:
+            self.data = (np.frombuffer("".join(data).encode(), dtype=np.uint8) - ord("0")).reshape(len(data), len(data[0]))
         self.k = k
-        self.size = (len(data), len(data[0]))
+        self.size = self.data.shape
         #This generator produces all the colours that will be needed, which is dependent on the number of states
         self.colours = [tuple([int(255 * (1-(i/(k-1)))) for j in range(3)]) for i in range(k)]
+        #The background states and the grid with its background removed are calculated the first time they are needed and then kept
+        self.background = None
+        self.foreground = None
     #__sub__ is a python magic method which is called whenever a Grid object is subtracted from another Grid object
     def __sub__(self, other):
         #Error handling - this isn't an issue in the main code since __sub__ is only used following get_background, but it could crop up if someone other program imports a Grid object
@@ -16,111 +25,154 @@ class Grid:
             raise ValueError("Grid sizes do not match")
         elif self.k != other.k:
             raise ValueError("Grid colours do not match")
-        new_data = []
         #We want to apply the second grid as a subtraction mask, so we simply subtract the value of each cell modulo k to get the new value
-        for i in range(self.size[0]):
-            self_row = self.data[i]
-            other_row = other.data[i]
-            new_row = ""
-            for j in range(self.size[1]):
-                new_row += str((int(self_row[j])-int(other_row[j]))%self.k)
-            new_data.append(new_row)
+        #k is added first so the unsigned values never go below zero
+        new_data = (self.data + (self.k - other.data)) % self.k
         #Although this returns a new Grid, using -= to assign on subtraction also uses the __sub__ method
         return Grid(self.k, new_data)
     #__eq__ is another magic method to compare equality
     def __eq__(self, other):
-        return (self.data == other.data)
+        return self.size == other.size and np.array_equal(self.data, other.data)
+    #Returns the colour of every cell as an array of (red, green, blue) values, looking them all up at once
+    #Each cell becomes a scale by scale square of pixels
+    def get_pixels(self, scale=1):
+        pixels = np.array(self.colours, dtype=np.uint8)[self.data]
+        if scale != 1:
+            pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+        return pixels
     def draw(self):
-        #Reverse size to get width then height, which is what pygame uses
-        image = pygame.Surface(self.size[::-1])
-        #Draw each cell as a one-pixel rectangle
-        for i in range(self.size[0]):
-            row = self.data[i]
-            for j in range(self.size[1]):
-                pygame.draw.rect(image, self.colours[int(row[j])], (j, i, 1, 1))
-        return(image)
+        #pygame is only needed for drawing, so it isn't imported until it's used. See render.py for saving images without pygame
+        import pygame
+        #pygame indexes pixels by x then y, so the rows and columns are swapped
+        return pygame.surfarray.make_surface(self.get_pixels().transpose(1, 0, 2))
     #get_slice returns a grid containing the cells found within the requested rectangle
     def get_slice(self, position, size):
         x,y = position
         w,h = size
-        slice_data = []
-        for i in range(h):
-            row = self.data[y+i]
-            slice_data.append(row[x:x+w])
-        return Grid(self.k, slice_data)
-    #get_background calculates the background pattern of the grid using the leftmost cells and returns a grid full of just that using the static method "regular"
+        #The slice is a view of this grid's data rather than a copy
+        return Grid(self.k, self.data[y:y+h, x:x+w])
+    #get_background_states calculates the background pattern of the grid using the leftmost cells, and returns an array of the background state of each step
+    def get_background_states(self):
+        if self.background is None:
+            bg_data = self.data[:self.k*2, 0].tolist()
+            initial_data = []
+            pattern = []
+            for i in range(0,self.k):
+                initial_data.append(bg_data[i])
+                if not bg_data[self.k+i] in pattern:
+                    pattern.append(bg_data[self.k+i])
+            self.background = Grid.regular(self.k, initial_data, pattern, (self.size[0], 1)).data[:, 0]
+        return self.background
+    #get_background returns a grid full of just the background pattern using the static method "regular"
     def get_background(self):
-        bg_data = self.get_slice((0,0),(1, self.k*2)).data
-        initial_data = ""
-        pattern = ""
-        for i in range(0,self.k):
-            initial_data += (bg_data[i][0])
-            if not bg_data[self.k+i][0] in pattern:
-                pattern += bg_data[self.k+i][0]
-        return Grid.regular(self.k, initial_data, pattern, self.size)
+        return Grid(self.k, np.broadcast_to(self.get_background_states()[:, None], self.size))
+    #remove_background returns this grid with its background subtracted. Each step's background state is subtracted from the whole row at once,
+    #   so a full size background grid is never built
+    #If this grid is memory-mapped, the result is written to another memory-mapped file beside it, a block of rows at a time, so it isn't held in memory either
+    def remove_background(self):
+        if self.foreground is None:
+            background = (self.k - self.get_background_states()[:, None])
+            if isinstance(self.data, np.memmap):
+                new_data = np.memmap(self.data.filename + ".foreground", dtype=np.uint8, mode="w+", shape=self.size)
+                rows = max(1, (1 << 24) // max(self.size[1], 1))
+                for y in range(0, self.size[0], rows):
+                    new_data[y:y+rows] = (self.data[y:y+rows] + background[y:y+rows]) % self.k
+            else:
+                new_data = (self.data + background) % self.k
+            self.foreground = Grid(self.k, new_data)
+        return self.foreground
     #Returns the first cell found from each direction on the requested row
     def find_edges(self, row_number):
-        #Use -1,-1 to represent no edges
-        edges = [-1,-1]
         row = self.data[row_number]
-        #reverse_row is used to check from both directions simultaneously
-        reverse_row = row[::-1]
-        for i in range(len(row)):
-            if row[i] != "0" and edges[0] == -1:
-                edges[0] = i
-            if reverse_row[i] != "0" and edges[1] == -1:
-                edges[1] = i
-            if edges[0] != -1 and edges[1] != -1:
-                break
-        return tuple(edges)
+        nonzero = np.flatnonzero(row)
+        #Use -1,-1 to represent no edges
+        if len(nonzero) == 0:
+            return (-1,-1)
+        #The second edge is counted from the right hand side
+        return (int(nonzero[0]), len(row) - 1 - int(nonzero[-1]))
     #Finds the number of connected cells of the same state from a given point, up to a provided maximum
+    #Returns the state and a list of the (x, y) positions of the cells found. A fill_cutoff of None removes the maximum
     def fill(self, start_at, fill_cutoff):
+        w = self.size[1]
+        fill_colour, cells_in = self.fill_cells(self.get_cell_bytes(), start_at[1]*w + start_at[0], fill_cutoff)
+        return (fill_colour, [(i % w, i // w) for i in cells_in])
+    #Calls fill from each of the points in turn, except for points which an earlier fill has already reached
+    #Returns a list of the result of each fill that was made, and a dictionary labelling every cell found with the index of the first fill to reach it
+    #With a fill_cutoff of None, each label is a whole region, so this labels the connected regions of the grid that contain the points
+    def fill_all(self, points, fill_cutoff):
+        cells = self.get_cell_bytes()
+        w = self.size[1]
+        results = []
+        labels = {}
+        for x, y in points:
+            if (x, y) in labels:
+                continue
+            fill_colour, cells_in = self.fill_cells(cells, y*w + x, fill_cutoff)
+            cells_in = [(i % w, i // w) for i in cells_in]
+            for cell in cells_in:
+                labels.setdefault(cell, len(results))
+            results.append((fill_colour, cells_in))
+        return results, labels
+    #Returns the cells as a sequence of bytes, which is much faster to index than the array. Cells are indexed by y*width + x
+    #The cells are copied into bytes, except for a memory-mapped grid, which is read in place so a large grid isn't copied into memory
+    def get_cell_bytes(self):
+        if isinstance(self.data, np.memmap) and self.data.flags.c_contiguous:
+            return memoryview(self.data.reshape(-1)).cast("B")
+        return self.data.tobytes()
+    #Performs the search used by fill. cells is the grid as bytes, and cells are referred to by their index in it, which is y*width + x
+    def fill_cells(self, cells, start, fill_cutoff):
+        h, w = self.size
         #First get the state we are looking for, and add the first cell to cells_to_check
-        fill_colour = self.data[start_at[1]][start_at[0]]
-        cells_to_check = [start_at]
+        fill_colour = cells[start]
+        cells_to_check = deque([start])
         cells_in = []
-        cells_out = []
         #The program performs a bredth-first search with additional constraints, as explained below
-        #cells_to_check is the list of cells to be explored, cells_in is the list of cells which have been explored,
-        #and cells_out is the list of cells which will never be added. By storing this we can save time on checking cells multiple times
-        while len(cells_to_check) != 0 and len(cells_in) < fill_cutoff: #cells_in is capped to avoid long wait times. This is accounted for in the main program
-            x,y = cells_to_check[0]
+        #cells_to_check is the queue of cells to be explored, and cells_in is the list of cells which have been explored.
+        #seen records every cell which has been queued or explored as True, and every cell which will never be added as False,
+        #   so each cell is looked up once rather than searched for in the lists
+        seen = {start: True}
+        while cells_to_check and (fill_cutoff is None or len(cells_in) < fill_cutoff): #cells_in is capped to avoid long wait times. This is accounted for in the main program
+            i = cells_to_check[0]
+            x, y = i % w, i // w
             #Only directly adjacent cells are checked - no diagonals
-            next_cells = [(x+1,y), (x,y+1),(x-1,y),(x,y-1)]
-            for cell in next_cells:
-                #If we have already seen the cell in any capacity, skip it
-                if cell in cells_in + cells_out + cells_to_check:
-                    continue
+            for dx, dy in ((1,0), (0,1), (-1,0), (0,-1)):
+                cx, cy = x + dx, y + dy
                 #If the cell is off the grid, skip it
-                if cell[0] >= self.size[1] or cell[0]<0 or cell[1] >= self.size[0] or cell[1] < 0:
+                if cx >= w or cx < 0 or cy >= h or cy < 0:
+                    continue
+                cell = cy*w + cx
+                #If we have already seen the cell in any capacity, skip it
+                if cell in seen:
                     continue
                 #If the cell is of the wrong state, skip it on all future runs
-                if self.data[cell[1]][cell[0]] != fill_colour:
-                    cells_out.append(cell)
+                if cells[cell] != fill_colour:
+                    seen[cell] = False
                     continue
+                #We check to see if the cell has a same-state neighbour parallel to the direction we are checking in.
+                #This prevents the algorithm from following a long thin path, instead focusing on wide open spaces
+                #The exact check is different depending on if the x or y values of this cell match the ones of the cell currently being explored
+                #A cell which fails this check isn't recorded, because it may still pass when it is reached from another direction
+                if dx != 0:
+                    wide = (cy + 1 < h and cells[cell + w] == fill_colour) or (cy - 1 >= 0 and cells[cell - w] == fill_colour)
                 else:
-                    #We check to see if the cell has a same-state neighbour parallel to the direction we are checking in.
-                    #This prevents the algorithm from following a long thin path, instead focusing on wide open spaces
-                    #The exact check is different depending on if the x or y values of this cell match the ones of the cell currently being explored
-                    if cell[0] != x:
-                        if (cell[1] + 1 < self.size[0] and self.data[cell[1] + 1][cell[0]] == fill_colour) or (cell[1] - 1 >= 0 and self.data[cell[1] - 1][cell[0]] == fill_colour):
-                            cells_to_check.append(cell)
-                    elif cell[1] != y:
-                        if (cell[0] + 1 < self.size[1] and self.data[cell[1]][cell[0] + 1] == fill_colour) or (cell[0] - 1 >= 0 and self.data[cell[1]][cell[0] - 1] == fill_colour):
-                            cells_to_check.append(cell)
+                    wide = (cx + 1 < w and cells[cell + 1] == fill_colour) or (cx - 1 >= 0 and cells[cell - 1] == fill_colour)
+                if wide:
+                    seen[cell] = True
+                    cells_to_check.append(cell)
             #We remove the cell currently being explored from cells_to_check and add it to cells_in
-            cells_in.append(cells_to_check.pop(0))
+            cells_in.append(cells_to_check.popleft())
         return (fill_colour, cells_in)
 
     #Returns a Grid object which has uniform states on each step. The first few steps contain the states of initial_data, and every step after that is a loop of pattern
+    #initial_data and pattern can be strings of digits or lists of states
     @staticmethod
     def regular(k, initial_data, pattern, size):
         l,w = size #l=length, w=width
         if len(initial_data) > l:
             raise ValueError("Initial data longer than length")
-        data = []
-        for c in initial_data:
-            data.append(c*w)
+        column = [int(c) for c in initial_data]
         for i in range(l-len(initial_data)):
-            data.append(pattern[i%len(pattern)]*w)
+            column.append(int(pattern[i%len(pattern)]))
+        #Every step is the same state all the way across, so the column is repeated across the width without copying it
+        data = np.broadcast_to(np.array(column, dtype=np.uint8)[:, None], (l, w))
         return Grid(k, data)
@@ -0,0 +1,210 @@
+import numpy as np
+from Automaton import get_rule_table
+from Grid import Grid
+
+#Evolves an automaton with the Hashlife algorithm, which can jump very far ahead in time for automata with regular or nested structure
+#The line of cells is stored as a binary tree. Every node covers 2^level cells, and identical nodes are only ever stored once,
+#   so a line with a lot of repetition is stored in very little space. The result of evolving each node is remembered,
+#   so a piece of the pattern which appears again, at any time or position, is never evolved twice
+#Nodes are referred to by their index in children. A node at the base level is a leaf, and holds its cells as a tuple instead of two children
+#Unlike Automaton, the line is unbounded rather than looped, and the cells outside the tree are all in the background state
+class HashLife:
+    def __init__(self, k, r, code, initial_conditions, table=None):
+        self.k = k
+        self.r = r
+        if table is None:
+            table = get_rule_table(k, r, code)
+        #A list is faster than an array for looking up one neighbourhood at a time
+        self.table = table.tolist()
+        self.uniform_index = (k ** (2*r+1) - 1) // (k - 1)
+        #Leaves cover 2^base cells. A node at level n is evolved 2^(n-base) steps at a time, and the base is chosen so that
+        #   r*2^(n-base) is at most a quarter of the node, which means the middle half of the node can't be affected by any cell outside it
+        self.base = 2
+        while (1 << (self.base - 2)) < r:
+            self.base += 1
+        #children holds the (left, right) pair of each node, or the cells of each leaf, and levels holds the level of each node
+        self.children = []
+        self.levels = []
+        #nodes finds the existing node for a pair of children or the cells of a leaf, so every node is only stored once
+        self.nodes = {}
+        #uniform holds the state of every node made entirely of one state
+        self.uniform = {}
+        #results holds the result of successor for each (node, j) already worked out
+        self.results = {}
+        self.time = 0
+        self.background = 0
+        #origin is the position of the first cell of root, with the first cell of the initial conditions at position 0
+        self.origin = 0
+        #states holds the state a uniform background reaches after 2^j steps for each (state, j) already worked out
+        self.states = {}
+        cells = [int(digit) for digit in initial_conditions]
+        self.length = len(cells)
+        #root always has at least two levels below it above the leaves, so the quarters of it can be checked in jump
+        level = self.base + 2
+        while (1 << level) < len(cells):
+            level += 1
+        self.root = self.build(cells + [0] * ((1 << level) - len(cells)), level)
+    #Returns the node with the given cells, of which there are 2^level
+    def build(self, cells, level):
+        if level == self.base:
+            return self.leaf(tuple(cells))
+        half = 1 << (level - 1)
+        return self.join(self.build(cells[:half], level - 1), self.build(cells[half:], level - 1))
+    def leaf(self, cells):
+        node = self.nodes.get(cells)
+        if node is None:
+            node = self.add(cells, self.base)
+            if cells.count(cells[0]) == len(cells):
+                self.uniform[node] = cells[0]
+        return node
+    #Returns the node whose children are left and right
+    def join(self, left, right):
+        node = self.nodes.get((left, right))
+        if node is None:
+            node = self.add((left, right), self.levels[left] + 1)
+            if left == right and left in self.uniform:
+                self.uniform[node] = self.uniform[left]
+        return node
+    def add(self, key, level):
+        self.nodes[key] = len(self.children)
+        self.children.append(key)
+        self.levels.append(level)
+        return len(self.children) - 1
+    #Returns the node at the given level made entirely of one state
+    def get_uniform(self, state, level):
+        if level == self.base:
+            return self.leaf((state,) * (1 << level))
+        node = self.get_uniform(state, level - 1)
+        return self.join(node, node)
+    #Returns the node made of the right half of a followed by the left half of b, which are both at the same level
+    def centre(self, a, b):
+        if self.levels[a] == self.base:
+            half = 1 << (self.base - 1)
+            return self.leaf(self.children[a][half:] + self.children[b][:half])
+        return self.join(self.children[a][1], self.children[b][0])
+    #Returns all of the cells of a node as a list
+    def get_cells(self, node):
+        if self.levels[node] == self.base:
+            return list(self.children[node])
+        left, right = self.children[node]
+        return self.get_cells(left) + self.get_cells(right)
+    #Applies the rule to the cells the given number of times. Each step is 2r cells shorter, as the cells at the ends don't have full neighbourhoods
+    def simulate(self, cells, steps):
+        size = 2*self.r + 1
+        modulus = self.k ** (size - 1)
+        for i in range(steps):
+            #The neighbourhood is read as a base k number, which is updated as it moves along rather than read again for every cell
+            index = 0
+            for cell in cells[:size - 1]:
+                index = index * self.k + cell
+            new_cells = []
+            for cell in cells[size - 1:]:
+                index = (index % modulus) * self.k + cell
+                new_cells.append(self.table[index])
+            cells = new_cells
+        return cells
+    #Returns the middle half of a node after 2^j steps, as a node one level lower. j can be at most level - base
+    def successor(self, node, j):
+        key = (node, j)
+        if key in self.results:
+            return self.results[key]
+        level = self.levels[node]
+        if node in self.uniform:
+            #A uniform node stays uniform, so only the state needs to be evolved
+            result = self.get_uniform(self.get_state(self.uniform[node], j), level - 1)
+        elif level == self.base + 1:
+            #The smallest nodes are evolved directly. The middle half starts a quarter of the way in, and each step removes r cells from the start
+            steps = 1 << j
+            cells = self.simulate(self.get_cells(node), steps)
+            start = (1 << (level - 2)) - self.r * steps
+            result = self.leaf(tuple(cells[start:start + (1 << (level - 1))]))
+        else:
+            left, right = self.children[node]
+            middle = self.centre(left, right)
+            if j == level - self.base:
+                #Evolve three overlapping nodes half of the steps, then the two nodes made from them the other half
+                a = self.successor(left, j - 1)
+                b = self.successor(middle, j - 1)
+                c = self.successor(right, j - 1)
+                second = j - 1
+            else:
+                #For fewer steps, the three overlapping nodes are just cut down to their middles, and all of the steps are done by the second two
+                a = self.centre(*self.children[left])
+                b = self.centre(*self.children[middle])
+                c = self.centre(*self.children[right])
+                second = j
+            result = self.join(self.successor(self.join(a, b), second), self.successor(self.join(b, c), second))
+        self.results[key] = result
+        return result
+    #Returns the state a uniform line of the given state reaches after 2^j steps, by evolving 2^(j-1) steps twice
+    def get_state(self, state, j):
+        key = (state, j)
+        if key not in self.states:
+            if j == 0:
+                self.states[key] = self.table[state * self.uniform_index]
+            else:
+                self.states[key] = self.get_state(self.get_state(state, j - 1), j - 1)
+        return self.states[key]
+    #Puts root in the middle of a node twice its size, padded with the background
+    def expand(self):
+        level = self.levels[self.root]
+        left, right = self.children[self.root]
+        padding = self.get_uniform(self.background, level - 1)
+        self.root = self.join(self.join(padding, left), self.join(right, padding))
+        self.origin -= 1 << (level - 1)
+    #Evolves the automaton 2^j steps
+    def jump(self, j):
+        #Everything outside the middle half of root must be background, so cells which grow out of the middle half stay inside root,
+        #   and root must be large enough to be evolved 2^j steps at once
+        padding = self.get_uniform(self.background, self.levels[self.root] - 2)
+        while self.levels[self.root] < j + self.base or self.children[self.children[self.root][0]][0] != padding or self.children[self.children[self.root][1]][1] != padding:
+            self.expand()
+            padding = self.get_uniform(self.background, self.levels[self.root] - 2)
+        #successor returns the middle half, so expanding first gives back a node covering the same cells as root
+        self.expand()
+        self.root = self.successor(self.root, j)
+        self.origin += 1 << (self.levels[self.root] - 1)
+        self.time += 1 << j
+        self.background = self.get_state(self.background, j)
+    #Evolves the automaton until the given time, by jumping through each power of 2 in the number of steps remaining
+    def evolve_to(self, time):
+        if time < self.time:
+            raise ValueError("The automaton can't be evolved backwards")
+        steps = time - self.time
+        j = 0
+        while steps:
+            if steps & 1:
+                self.jump(j)
+            steps >>= 1
+            j += 1
+    #Returns the cells of the current step from position start up to but not including end, as an array
+    def get_row(self, start, end):
+        row = np.full(end - start, self.background, dtype=np.uint8)
+        self.write_cells(self.root, self.origin, start, end, row)
+        return row
+    #Writes the cells of node, whose first cell is at position offset, into the part of row between start and end
+    def write_cells(self, node, offset, start, end, row):
+        size = 1 << self.levels[node]
+        if offset >= end or offset + size <= start:
+            return
+        low, high = max(offset, start), min(offset + size, end)
+        if node in self.uniform:
+            row[low - start:high - start] = self.uniform[node]
+        elif self.levels[node] == self.base:
+            row[low - start:high - start] = self.children[node][low - offset:high - offset]
+        else:
+            left, right = self.children[node]
+            self.write_cells(left, offset, start, end, row)
+            self.write_cells(right, offset + size // 2, start, end, row)
+    #Returns a Grid of the cells between start and end at each of the given times, which must be in increasing order
+    #If start and end aren't given, the grid has the same columns as an Automaton run for the last of the times
+    #   (the initial conditions with r cells of padding per step on each side), and times can skip steps to give a smaller grid of a very long run
+    def get_grid(self, times, start=None, end=None):
+        times = list(times)
+        if start is None:
+            start, end = -self.r * times[-1], self.length + self.r * times[-1]
+        rows = []
+        for time in times:
+            self.evolve_to(time)
+            rows.append(self.get_row(start, end))
+        return Grid(self.k, np.array(rows))
@@ -0,0 +1,99 @@
+import os, sqlite3, zlib
+from collections import OrderedDict
+import numpy as np
+from Grid import Grid
+
+#Cache of classification results, and optionally the grids that produced them
+#Results are keyed by (k, r, code, initial conditions, max_steps) along with a version number for the classifier,
+#   so results from an older version of the analysis are never returned
+#The most recently used results are kept in memory, and if a path is given every result is also stored in an SQLite database there.
+#   Grids are compressed before being stored, and once the database holds more than max_bytes of grids the least recently used results are removed
+class ResultCache:
+    def __init__(self, version, path=None, memory_size=64, max_bytes=256*1024*1024):
+        self.version = version
+        self.memory_size = memory_size
+        self.max_bytes = max_bytes
+        #memory holds (result, grid) pairs, ordered from least to most recently used
+        self.memory = OrderedDict()
+        self.connection = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self.connection = sqlite3.connect(path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result INTEGER, k INTEGER, rows INTEGER, columns INTEGER, grid BLOB, size INTEGER, used INTEGER)")
+            #used records when each result was last read or written, so the least recently used can be removed first
+            self.used, self.total = self.connection.execute("SELECT COALESCE(MAX(used), 0), COALESCE(SUM(size), 0) FROM results").fetchone()
+    #Codes can be far larger than SQLite's integers, so the key is stored as text
+    def get_key(self, k, r, code, ic, max_steps):
+        return ",".join([str(k), str(r), str(code), ic, str(max_steps), str(self.version)])
+    #Returns (result, grid) for the automaton, or None if it isn't in the cache. grid is None if only the result was stored
+    def get(self, k, r, code, ic, max_steps):
+        key = self.get_key(k, r, code, ic, max_steps)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.connection is None:
+            return None
+        row = self.connection.execute("SELECT result, rows, columns, grid FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        result, rows, columns, data = row
+        grid = None
+        if data is not None:
+            grid = Grid(k, np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(rows, columns))
+        self.used += 1
+        self.connection.execute("UPDATE results SET used = ? WHERE key = ?", (self.used, key))
+        self.connection.commit()
+        self.remember(key, (result, grid))
+        return (result, grid)
+    #Stores the result of an automaton, along with its grid if one is given
+    #A memory-mapped grid isn't kept in memory, since its file can be overwritten by a later run. With a database, the grid is read back
+    #   from there when it is next asked for, and without one only the result is kept
+    def put(self, k, r, code, ic, max_steps, result, grid=None):
+        key = self.get_key(k, r, code, ic, max_steps)
+        mapped = grid is not None and isinstance(grid.data, np.memmap)
+        if not mapped:
+            self.remember(key, (result, grid))
+        elif self.connection is None:
+            self.remember(key, (result, None))
+        if self.connection is None:
+            return
+        if grid is None:
+            rows, columns, data = None, None, None
+        else:
+            rows, columns = grid.size
+            data = self.compress(grid)
+        size = len(data) if data is not None else 0
+        #Replacing an existing result removes its size from the total first
+        old = self.connection.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        if old is not None:
+            self.total -= old[0]
+        self.used += 1
+        self.connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (key, result, k, rows, columns, data, size, self.used))
+        self.total += size
+        self.evict()
+        self.connection.commit()
+    #Compresses the cells of a grid a block of rows at a time, so a memory-mapped grid is never read into memory all at once
+    def compress(self, grid):
+        compressor = zlib.compressobj()
+        rows = max(1, (1 << 24) // max(grid.size[1], 1))
+        blocks = [compressor.compress(np.ascontiguousarray(grid.data[y:y+rows]).tobytes()) for y in range(0, grid.size[0], rows)]
+        blocks.append(compressor.flush())
+        return b"".join(blocks)
+    #Adds a result to the memory, removing the least recently used once there are more than memory_size
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+    #Removes the least recently used results from the database until its grids fit within max_bytes
+    def evict(self):
+        while self.total > self.max_bytes:
+            key, size = self.connection.execute("SELECT key, size FROM results ORDER BY used LIMIT 1").fetchone()
+            self.connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.total -= size
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
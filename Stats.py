@@ -0,0 +1,68 @@
+import time
+
+#Counters and timings recorded by the analysis, used to see where the time goes when classifying automata
+#The analysis functions take an optional Stats object and only record anything when one is given, so there is almost no cost when they aren't
+#A Stats object can either describe a single automaton, or be a total of many made with add, which also keeps a histogram of each counter and time
+class Stats:
+    def __init__(self):
+        #times holds the total seconds spent in each stage, and counts holds the total of each counter
+        self.times = {}
+        self.counts = {}
+        #histograms holds, for each counter and stage, how many automata had a value in each bucket. Buckets are powers of 2,
+        #   and bucket b holds values from b up to 2b. Times are bucketed in microseconds
+        self.histograms = {}
+        #automata is the number of automata added with add
+        self.automata = 0
+    #Returns the time to pass to add_time later, for timing a stage
+    @staticmethod
+    def start():
+        return time.perf_counter()
+    #Adds the time since start to the given stage
+    def add_time(self, stage, start):
+        self.times[stage] = self.times.get(stage, 0) + time.perf_counter() - start
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+    #Adds the stats of a single automaton to this total, and to the histograms
+    def add(self, other):
+        self.automata += 1
+        for stage, seconds in other.times.items():
+            self.times[stage] = self.times.get(stage, 0) + seconds
+            self.add_to_histogram(stage, int(seconds * 1e6))
+        for name, amount in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + amount
+            self.add_to_histogram(name, amount)
+    def add_to_histogram(self, name, value):
+        bucket = 1 << (value.bit_length() - 1) if value > 0 else 0
+        histogram = self.histograms.setdefault(name, {})
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+    #Adds another total to this one, such as the total from a worker process
+    def merge(self, other):
+        self.automata += other.automata
+        for stage, seconds in other.times.items():
+            self.times[stage] = self.times.get(stage, 0) + seconds
+        for name, amount in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + amount
+        for name, histogram in other.histograms.items():
+            total = self.histograms.setdefault(name, {})
+            for bucket, number in histogram.items():
+                total[bucket] = total.get(bucket, 0) + number
+    #Returns the stats as a dictionary which can be written as JSON
+    def to_dict(self):
+        return {"automata": self.automata, "times": self.times, "counts": self.counts,
+                "histograms": {name: {str(bucket): number for bucket, number in sorted(histogram.items())} for name, histogram in self.histograms.items()}}
+    #Returns the stats as lines of text: the total and mean of every stage and counter, followed by its histogram
+    def report(self):
+        automata = max(self.automata, 1)
+        lines = ["Stats for " + str(self.automata) + " automata"]
+        for stage, seconds in sorted(self.times.items(), key=lambda item: -item[1]):
+            lines.append(stage.ljust(24) + ("%.3f s total" % seconds).rjust(16) + ("%.3f ms mean" % (seconds * 1000 / automata)).rjust(18))
+            lines.append(self.histogram_line(stage, "us"))
+        for name, amount in sorted(self.counts.items()):
+            lines.append(name.ljust(24) + (str(amount) + " total").rjust(16) + ("%.1f mean" % (amount / automata)).rjust(18))
+            lines.append(self.histogram_line(name, ""))
+        return "\n".join(line for line in lines if line)
+    def histogram_line(self, name, unit):
+        if name not in self.histograms:
+            return ""
+        buckets = sorted(self.histograms[name].items())
+        return "    " + "  ".join((str(bucket) + "-" + str(2*bucket - 1) if bucket > 1 else str(bucket)) + unit + ": " + str(number) for bucket, number in buckets)
@@ -0,0 +1,58 @@
+import numpy as np
+
+#Index used to compare rectangular tiles of a Grid without slicing them out
+#Each band of rows is turned into a list of rolling hashes (Rabin-Karp style), so the hash of any tile in the band takes constant time to find.
+#   Tiles are only compared cell by cell when their hashes match
+class TileIndex:
+    #A large prime which all hashes are taken modulo
+    modulus = (1 << 61) - 1
+    #If a Stats object is given, the number of tiles compared is counted in it, along with how many of those had their cells compared
+    def __init__(self, grid, stats=None):
+        self.grid = grid
+        self.stats = stats
+        #Bands are indexed the first time a tile in them is needed, and are stored by their first row and height
+        self.bands = {}
+    #Returns the prefix hashes of a band of rows and the powers of its base
+    def get_band(self, y, height):
+        if (y, height) not in self.bands:
+            k = self.grid.k
+            #Each column of the band is read as a base k number, so two columns have the same value only if their cells are the same
+            rows = self.grid.data[y:y+height].astype(np.int64)
+            columns = (rows * (k ** np.arange(height, dtype=np.int64))[:, None]).sum(axis=0).tolist()
+            #The base is larger than any column value, so the hash of a run of columns is their exact value before taking the modulus
+            base = k ** height
+            hashes = [0]
+            powers = [1]
+            for column in columns:
+                hashes.append((hashes[-1] * base + column) % self.modulus)
+                powers.append((powers[-1] * base) % self.modulus)
+            self.bands[(y, height)] = (hashes, powers)
+        return self.bands[(y, height)]
+    #Returns the hash of the tile covering the given rows and columns, which are ranges
+    def tile_hash(self, rows, columns):
+        hashes, powers = self.get_band(rows.start, len(rows))
+        return (hashes[columns.stop] - hashes[columns.start] * powers[len(columns)]) % self.modulus
+    #Checks whether the tiles at positions a and b of the given size are the same
+    #This gives the same answer as comparing the two tiles from Grid.get_slice, including for tiles which go off the edge of the grid,
+    #   except that tiles with no cells never match. Otherwise a pattern starting beyond the edge of the grid would match forever
+    def match(self, a, b, size):
+        h, w = self.grid.size
+        if self.stats is not None:
+            self.stats.count("tile_comparisons")
+        #Slicing a range follows the same rules as slicing the grid, so these are the rows and columns get_slice would return
+        rows_a = range(h)[a[1]:a[1]+size[1]]
+        rows_b = range(h)[b[1]:b[1]+size[1]]
+        columns_a = range(w)[a[0]:a[0]+size[0]]
+        columns_b = range(w)[b[0]:b[0]+size[0]]
+        if len(rows_a) != len(rows_b) or len(columns_a) != len(columns_b):
+            return False
+        if len(rows_a) == 0 or len(columns_a) == 0:
+            return False
+        if self.tile_hash(rows_a, columns_a) != self.tile_hash(rows_b, columns_b):
+            return False
+        #The hashes match, so check the cells themselves
+        if self.stats is not None:
+            self.stats.count("tile_cell_comparisons")
+        tile_a = self.grid.data[rows_a.start:rows_a.stop, columns_a.start:columns_a.stop]
+        tile_b = self.grid.data[rows_b.start:rows_b.stop, columns_b.start:columns_b.stop]
+        return np.array_equal(tile_a, tile_b)
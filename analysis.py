@@ -0,0 +1,253 @@
+from Automaton import Automaton, padNumber
+from TileIndex import TileIndex
+from Stats import Stats
+
+#The classification of automata, separated from the interactive program in main.py so it can be imported by other programs and worker processes
+#The parameters below are the defaults used by every function, and each of them can also be passed to the functions which use it
+#The functions which take stats record their timings and counters in it when a Stats object is given. See Stats.py
+
+#Total number of steps an automaton is run for
+max_steps = 300
+#Total number of cells which can be filled by a Grid object's fill function 
+fill_cutoff = 500
+#Spacing of the points the Grid's fill method is called at when checking for a fractal
+sample_spacing = 50
+#Largest (width, height) of pattern which is checked for when checking for a simple repeating pattern
+max_pattern = (5,15)
+#Version of the analysis, which is part of the key of every cached result. This should be increased whenever a change to the analysis could change a result
+classifier_version = 1
+
+
+#Function to generate every intial condition of the given size or less in k states, as a list. See iter_ics for the order
+def generate_ics(k, size):
+    return list(iter_ics(k, size))
+
+#Generator which yields every initial condition of the given size or less in k states, without building them all first
+#The conditions come in order of length. Each condition of a given length is a nonzero colour followed by a shorter condition padded with zeroes,
+#   taking the shorter conditions in the order they were yielded
+def iter_ics(k, size):
+    for length in range(1, size+1):
+        for ic in iter_ics_of_length(k, length):
+            yield ic
+
+#Generator which yields the initial conditions of exactly the given length, in the same order as iter_ics. Uses recursion to get the shorter conditions
+def iter_ics_of_length(k, length):
+    if length == 1:
+        for i in range(1,k):
+            yield str(i)
+    else:
+        for ic in iter_ics(k, length-1):
+            for colour in range(1,k):
+                yield str(colour) + padNumber(ic, length - 1)
+
+
+#Calculates the growth rate of a given Grid object
+#Returns the gradients from each side as a tuple
+def get_shape(grid):
+    #Removing the background gives a more accurate assessment of the gradient
+    #This also ensures any non-background state is nonzero
+    grid = grid.remove_background()
+    points = []
+    #The first and last steps are checked, so grids of any number of steps can be measured
+    check_at = [0, grid.size[0]-1]
+    for i in check_at:
+        point = grid.find_edges(i)
+        if point == (-1,-1):
+            #If no point is found at either location, the grid does not contain a solid shape
+            return
+        else:
+            points.append(point)
+    growth_rate = tuple([(points[0][i] - points[1][i])/(grid.size[0]-1) for i in range(2)])
+    return growth_rate
+
+#Checks whether a given Grid object contains a simple repeating pattern
+#max_pattern defines the maximum size of pattern which is checked for. The minimum is always 2x2, because a 1x1 pattern will also form a 2x2 pattern
+def check_simple_pattern(grid, growth_rate, max_pattern=max_pattern, stats=None):
+    h, w = grid.size
+    #This generator uses (j,i) so the height changes less frequently than the width (i.e the list goes [(2,2),(3,2),(4,2)...(2,3),(3,3),...])
+    #   because the cells above are checked first. As a result, that check is more likely to indicate the presence of a pattern, so the program will
+    #   spend more time on a height range which is successful rather than skippig around 
+    pattern_sizes = [(j,i) for i in range(2,max_pattern[0]+1) for j in range(2, max_pattern[1]+1)]
+    #Tiles are compared using a hash index of the grid rather than by slicing each one out of the grid
+    index = TileIndex(grid, stats)
+    half_match = False
+    if growth_rate[0] > 0.1:
+        #The program checks the bottom row, 20% in from the edge
+        base_start =(int(w / 2 * (1 - growth_rate[0] * 0.8)),h-1)
+        for size in pattern_sizes:
+            start = (base_start[0], base_start[1] - size[1])
+            #First check the cells above
+            if not index.match(start, (start[0],start[1]-size[1]), size):
+                continue
+            #Then check the adjacent cells - we want at least 80% of the length to be this same pattern
+            #First check left from the start. The cells above have already matched, which counts as the first match
+            match_count = 1
+            x = start[0] - size[0]
+            while index.match(start, (x,start[1]), size):
+                match_count += 1
+                x -= size[0]
+            #Then check right from the start, with a buffer of size[0] to ensure the start pattern isn't counted twice
+            x = start[0] + size[0]
+            while index.match(start, (x,start[1]), size):
+                match_count += 1
+                x += size[0]
+            #If it matched at least 80% of the length along the pattern, that's sufficient to classify it as a simple repeating pattern
+            if match_count * size[0] >= ((growth_rate[0]+growth_rate[1]) / 2) * w  * 0.8 : 
+                return True
+            #If it didn't, the automaton might still be a simple repeating pattern if it is asymmetrical.
+            #We should only check from the othe side if at least 80% of the pattern was matched in the right hand half of the structure
+            elif match_count * size[0] >= (growth_rate[0] / 2) * w  * 0.8 :
+                half_match = True
+                break
+        if not half_match: #If it didn't at least match half, it cannot be a simple pattern
+            return False
+    #If the program reaches here, either the other side had gradient < 0.1 or the it matched half
+    #As a result, if this side matches (with the same process as above) the automaton can be classified as a simple repeating pattern
+    if growth_rate[1] > 0.1:
+        base_start =(int(w / 2 * (1 + growth_rate[1] * 0.8)),h-1)
+        for size in pattern_sizes:
+            start = (base_start[0], base_start[1] - size[1])
+            if not index.match(start, (start[0],start[1]-size[1]), size):
+                continue
+            match_count = 1
+            x = start[0] + size[0]
+            while index.match(start, (x,start[1]), size):
+                match_count += 1
+                x += size[0]
+            x = start[0] - size[0]
+            while index.match(start, (x,start[1]), size):
+                match_count += 1
+                x -= size[0]
+            #Here we only check for half, since if the whole matched it would have done so in the first half of this function
+            if match_count * size[0] >= (growth_rate[1] / 2) * w  * 0.8 :
+                return True
+    return False
+
+#This function checks if the grid contains a fractal pattern. It takes quite a bit of time, so it should be done after the
+#   simple repeating pattern check
+#spacing is the distance between the points the Grid's fill method is called at
+def check_fractal(grid, growth_rate, fill_cutoff=fill_cutoff, spacing=sample_spacing, stats=None):
+    h, w = grid.size
+    prelim_points = [(i*spacing,j*spacing) for i in range(w//spacing) for j in range(h//spacing)]
+    points_to_check = []
+    for point in prelim_points:
+        #We only check the points that are within the shape produced by the automaton
+        if ((w/2) - point[0] < point[1] * growth_rate[0]) and (point[0] - (w/2) < point[1] * growth_rate[1]):
+            points_to_check.append(point)
+    #fill_all calls the Grid's fill method at each point, skipping any point which has already been found by an earlier fill in order to save time
+    #fills is a list of the colour found and the points filled by each call, and labels contains every point filled
+    fills, labels = grid.fill_all(points_to_check, fill_cutoff)
+    if stats is not None:
+        stats.count("fill_points", len(points_to_check))
+        stats.count("fill_calls", len(fills))
+        stats.count("cells_visited", sum(len(fill[1]) for fill in fills))
+    #The eventual decision is made based on the ratio of maximum possible points that could be filled and the number that were actually filled
+    #This first number is dependent on the number of times the fill method was called
+    max_size = len(fills) * fill_cutoff
+    #Each point is only labelled once, so counting the labels of each colour counts the distinct points filled in that colour
+    filled_count = {}
+    for label in labels.values():
+        colour = fills[label][0]
+        filled_count[colour] = filled_count.get(colour, 0) + 1
+    for colour in filled_count.keys():
+        #If the threshold of 1/3 of the maximum possible cells is passed, the automaton is classified as a fractal
+        if filled_count[colour] >= max_size/3:
+            return True
+    return False
+
+#This function performs each of the analysis functions above in order, and reurns a number indicating the classification of the automaton
+#These numbers correspond to the list behaviour_types below
+#If stats is given, the time spent in each check is recorded in it
+def analyse_grid(grid, fill_cutoff=fill_cutoff, spacing=sample_spacing, max_pattern=max_pattern, stats=None):
+    if stats is not None:
+        start = Stats.start()
+    shape = get_shape(grid)
+    if stats is not None:
+        stats.add_time("get_shape", start)
+    is_fractal = False
+    if shape == None:
+        return 0
+    #We compare the difference between the two gradients here - if it is less than 0.2, the automaton is classified as a line
+    #The reason they are added is because the gradients are signed based on their direction. Outwards is positive, inwards is negative
+    elif (shape[0] + shape[1] < 0.2):
+        return 1
+    else:
+        #If there is a gradient and the difference is at least 0.2, the automaton forms a 2D shape
+        #The grid keeps the result of removing the background from get_shape, so this doesn't repeat the work
+        grid = grid.remove_background()
+        if stats is not None:
+            start = Stats.start()
+        is_simple = check_simple_pattern(grid, shape, max_pattern, stats)
+        if stats is not None:
+            stats.add_time("check_simple_pattern", start)
+        if (is_simple):
+            return 2
+        if stats is not None:
+            start = Stats.start()
+        is_fractal = check_fractal(grid, shape, fill_cutoff, spacing, stats)
+        if stats is not None:
+            stats.add_time("check_fractal", start)
+        if(is_fractal):
+            return 3
+        else:
+            return 4
+
+#Evolves a newly created automaton for the given number of steps and classifies it, giving the same result as analyse_grid on the finished grid
+#Each step is hashed as it is produced. Once a step repeats an earlier one, every later step must follow the same cycle,
+#   so the rest of the grid is filled in by repeating the cycle rather than evolving it. This also stops automata which die out early,
+#   since every step after the active cells disappear is uniform, and uniform steps repeat within k steps
+#If stats is given, the time spent evolving and the number of steps evolved and repeated are recorded in it, along with the stats of analyse_grid
+def classify_automaton(rule, steps=max_steps, fill_cutoff=fill_cutoff, spacing=sample_spacing, max_pattern=max_pattern, stats=None):
+    if stats is not None:
+        start = Stats.start()
+    seen = {hash(rule.get_step_key(0)): 0}
+    #repeated is the number of steps filled in by repeating a cycle
+    repeated = 0
+    for step in rule.evolve(steps):
+        key = hash(rule.get_step_key(rule.time))
+        #The hashes only narrow down which step to compare with, so the steps themselves are checked before stopping
+        if key in seen and rule.get_step_key(seen[key]) == rule.get_step_key(rule.time):
+            repeated = steps - rule.time
+            rule.repeat_cycle(seen[key], repeated)
+            break
+        seen[key] = rule.time
+    if stats is not None:
+        stats.count("steps_evolved", steps - repeated)
+        stats.count("steps_repeated", repeated)
+        stats.add_time("evolve", start)
+    return analyse_grid(rule.get_grid(), fill_cutoff, spacing, max_pattern, stats)
+
+#behaviour types is textual description of each of the five possibilities for the behaviour of the automaton itself
+behaviour_types = [
+    "All active cells disappear before the end of the program.",
+    "The code produces a line.",
+    "The code produces a simple repeating pattern.",
+    "The code produces a nested fractal pattern.",
+    "The code produces a complex design which doesn't fall into any of the other categories.",]
+
+
+#Returns the version to create a ResultCache with for the given parameters, so results found with different parameters are kept apart
+#The number of steps is already part of every key in the cache
+def cache_version(fill_cutoff=fill_cutoff, spacing=sample_spacing, max_pattern=max_pattern):
+    return str(classifier_version) + "_" + str(fill_cutoff) + "_" + str(spacing) + "_" + str(max_pattern[0]) + "x" + str(max_pattern[1])
+
+#Runs and classifies an automaton for the given number of steps, returning the result and the finished grid
+#If a ResultCache is given, a cached grid is used instead of running the automaton again, and new results are added to the cache.
+#   The cache should have been created with cache_version for the same parameters
+#If stats is given, it records the stats of classify_automaton, or a cache hit if the result was cached
+#If path is given, the steps are kept in a memory-mapped file at path while the automaton is run, and the grid returned reads from that file.
+#   The file is overwritten by the next run given the same path, so each grid that is still in use needs its own path
+def run_automaton(k, r, code, ic, cache=None, steps=max_steps, fill_cutoff=fill_cutoff, spacing=sample_spacing, max_pattern=max_pattern, stats=None, path=None):
+    if cache is not None:
+        entry = cache.get(k, r, code, ic, steps)
+        if entry is not None and entry[1] is not None:
+            if stats is not None:
+                stats.count("cache_hits")
+            return entry
+    rule = Automaton(k, r, code, ic, steps, engine="lightcone", path=path)
+    result = classify_automaton(rule, steps, fill_cutoff, spacing, max_pattern, stats)
+    grid = rule.get_grid()
+    if cache is not None:
+        cache.put(k, r, code, ic, steps, result, grid)
+    return (result, grid)
+
@@ -0,0 +1,123 @@
+import itertools
+import numpy as np
+from Automaton import get_rule_table
+from Grid import Grid
+
+#Runs many elementary automata (2 states, range 1) together, which is much faster than building an Automaton for each one
+#Every run is stored as a block of bits inside one large integer, with cell j of run n held in bit n*width + j.
+#   A step then only takes a few bitwise operations on that integer, no matter how many runs there are
+#Runs are processed batch_size at a time so that the finished grids don't all have to be held in memory together
+#Yields a Grid for each (code, initial conditions) pair, in the order they were given
+def iter_elementary_batch(runs, max_steps, batch_size=256):
+    runs = list(runs)
+    for i in range(0, len(runs), batch_size):
+        chunk = runs[i:i+batch_size]
+        #Runs can only share an integer if they are the same width, which depends on the length of the initial condition
+        grids = [None] * len(chunk)
+        lengths = list(dict.fromkeys([len(ic) for code, ic in chunk]))
+        for length in lengths:
+            positions = [j for j in range(len(chunk)) if len(chunk[j][1]) == length]
+            group = [chunk[j] for j in positions]
+            for j, grid in zip(positions, run_packed(group, max_steps)):
+                grids[j] = grid
+        for grid in grids:
+            yield grid
+
+#Returns a list of the Grids produced by each (code, initial conditions) pair
+def run_elementary_batch(runs, max_steps, batch_size=256):
+    return list(iter_elementary_batch(runs, max_steps, batch_size))
+
+#Evolves a group of runs whose initial conditions are all the same length, returning a list of Grid objects
+def run_packed(runs, max_steps):
+    n = len(runs)
+    #The padding matches Automaton, so every row is identical to the one it would produce
+    width = len(runs[0][1]) + 2*max_steps
+    total = n * width
+    full = (1 << total) - 1
+    block = (1 << width) - 1
+    #first_bits and last_bits mark the first and last cell of each run, which is where the rows loop round
+    first_bits = 0
+    for i in range(n):
+        first_bits |= 1 << (i*width)
+    last_bits = first_bits << (width-1)
+    not_first = full ^ first_bits
+    not_last = full ^ last_bits
+    #masks[p] has every bit set for the runs whose rule sends neighbourhood p to 1
+    masks = [0] * 8
+    for i in range(n):
+        code = runs[i][0]
+        for p in range(8):
+            if (code >> p) & 1:
+                masks[p] |= block << (i*width)
+    #The bits are read from the string in reverse, so cell j of the string ends up in bit j
+    steps = ["".join(["0"*max_steps + ic + "0"*max_steps for code, ic in runs])]
+    cells = int(steps[0][::-1], 2)
+    for t in range(max_steps):
+        #left holds each cell's left neighbour and right its right neighbour, looping round at the edges of each run
+        left = ((cells << 1) & not_first) | ((cells >> (width-1)) & first_bits)
+        right = ((cells >> 1) & not_last) | ((cells << (width-1)) & last_bits & full)
+        states = [(full ^ left, left), (full ^ cells, cells), (full ^ right, right)]
+        result = 0
+        for p in range(8):
+            if masks[p] == 0:
+                continue
+            #Bits are set here only where the neighbourhood is exactly p, and the rule for that run sends p to 1
+            match = states[0][p >> 2] & states[1][(p >> 1) & 1] & states[2][p & 1]
+            result |= match & masks[p]
+        cells = result
+        steps.append(format(cells, "b").zfill(total)[::-1])
+    #Convert every step to states at once, then reorder so each run's grid is one contiguous block
+    states = (np.frombuffer("".join(steps).encode(), dtype=np.uint8) - ord("0")).reshape(len(steps), n, width)
+    states = np.ascontiguousarray(states.transpose(1, 0, 2))
+    return [Grid(2, states[i]) for i in range(n)]
+
+#Runs one rule on many initial conditions together, for any number of states and range
+#The rule table is only made once, and the initial conditions of the same length are evolved together as one 3D array of (initial condition, step, cell),
+#   so every step of all of them takes a single lookup in the table
+#ics can be any iterable, such as analysis.iter_ics. It is read batch_size initial conditions at a time, so they are never all held in memory
+#Yields a Grid for each initial condition, in the order they were given
+def iter_ic_batch(k, r, code, ics, max_steps, batch_size=64, table=None):
+    if table is None:
+        table = get_rule_table(k, r, code)
+    ics = iter(ics)
+    while True:
+        chunk = list(itertools.islice(ics, batch_size))
+        if not chunk:
+            return
+        grids = [None] * len(chunk)
+        for length in dict.fromkeys([len(ic) for ic in chunk]):
+            positions = [j for j in range(len(chunk)) if len(chunk[j]) == length]
+            for j, grid in zip(positions, run_stacked(k, r, table, [chunk[j] for j in positions], max_steps)):
+                grids[j] = grid
+        for grid in grids:
+            yield grid
+
+#Evolves one rule table on a group of initial conditions which are all the same length, returning a list of Grid objects
+#The padding matches Automaton, so every grid is identical to the one it would produce
+def run_stacked(k, r, table, ics, max_steps):
+    n = len(ics)
+    length = len(ics[0])
+    padding = r*max_steps
+    width = length + 2*padding
+    cells = np.zeros((n, max_steps+1, width), dtype=np.uint8)
+    cells[:, 0, padding:padding+length] = (np.frombuffer("".join(ics).encode(), dtype=np.uint8) - ord("0")).reshape(n, length)
+    #The index of the neighbourhood made of a single state s is s*uniform_index
+    uniform_index = (k ** (2*r+1) - 1) // (k - 1)
+    background = 0
+    for t in range(max_steps):
+        #Only the cells within r*t of the initial conditions can differ from the background, which is the same for every initial condition,
+        #   so just those cells and the r cells either side of them are evolved, in the same way as the lightcone engine
+        start, end = padding - r*t, padding + length + r*t
+        segment = np.full((n, end - start + 4*r), background, dtype=np.uint8)
+        segment[:, 2*r:2*r + end - start] = cells[:, t, start:end]
+        index = segment[:, :end - start + 2*r].astype(np.intp)
+        for i in range(1, 2*r+1):
+            index *= k
+            index += segment[:, i:i + end - start + 2*r]
+        cells[:, t+1, start-r:end+r] = table[index]
+        background = int(table[background * uniform_index])
+        #The array starts as zeroes, so the background outside the evolved cells only needs filling in when it isn't 0
+        if background != 0:
+            cells[:, t+1, :start-r] = background
+            cells[:, t+1, end+r:] = background
+    return [Grid(k, cells[i]) for i in range(n)]
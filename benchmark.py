@@ -0,0 +1,159 @@
+import argparse, json, os, platform, sys, tempfile, time, tracemalloc
+import numpy as np
+from Automaton import Automaton
+from Grid import Grid
+from render import write_png
+from sweep import classify_chunk
+import analysis
+
+#Times each stage of running and classifying automata on a fixed set of workloads, so the effect of a change can be measured
+#Results can be saved as a baseline, and a later run compared against it to spot stages which have become slower
+
+#Every workload is (k, r, code, initial conditions, steps). These never change, so results from different runs can be compared
+#Rules 30, 90 and 110 are run on several widths of initial conditions and up to several thousand steps, and the k=3 codes
+#   are examples of each behaviour type other than dying out: a line, a simple pattern, a fractal and a complex design
+workloads = [
+    (2, 1, 30, "1", 300), (2, 1, 30, "1", 1000), (2, 1, 30, "1", 3000),
+    (2, 1, 30, "10011", 1000), (2, 1, 30, "1101001011", 1000),
+    (2, 1, 90, "1", 300), (2, 1, 90, "1", 1000), (2, 1, 90, "1", 3000),
+    (2, 1, 90, "10011", 1000),
+    (2, 1, 110, "1", 300), (2, 1, 110, "1", 1000), (2, 1, 110, "1", 3000),
+    (2, 1, 110, "1101001011", 1000),
+    (3, 1, 4393246794948, "102", 300), (3, 1, 1995021923540, "1", 300),
+    (3, 1, 6823427603111, "102", 300), (3, 1, 5181419999932, "1", 300),
+    (3, 1, 6823427603111, "102", 1000), (3, 1, 5181419999932, "1", 1000),
+]
+
+#Every sweep workload is (k, r, first code, number of codes, initial conditions), run through sweep.classify_chunk at the default number of steps
+sweep_workloads = [
+    (2, 1, 0, 256, ["1"]),
+    (2, 1, 0, 64, analysis.generate_ics(2, 3)),
+    (3, 1, 5181419999900, 32, ["1"]),
+]
+
+def workload_name(k, r, code, ic, steps):
+    return "k" + str(k) + "_r" + str(r) + "_" + str(code) + "_" + ic + "_" + str(steps)
+
+#Runs function repeats times, returning the shortest time taken and the peak memory allocated during one further run
+#The memory is measured on a separate run because tracing allocations slows the function down
+def measure(function, repeats):
+    best = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+#Times every stage of a workload, returning a dictionary of stage name to its measurements
+#Each stage is given the output of the stages before it, so only the stage itself is timed.
+#   Stages which cache their results on the Grid are given a new Grid around the same cells every time
+def run_workload(k, r, code, ic, steps, engines, repeats):
+    stages = {}
+    def add(stage, function, cells):
+        seconds, peak = measure(function, repeats)
+        stages[stage] = {"seconds": seconds, "cells_per_second": cells / seconds if seconds else None, "peak_bytes": peak}
+    for engine in engines:
+        def evolve():
+            rule = Automaton(k, r, code, ic, steps, engine=engine)
+            rule.process_steps(steps)
+            return rule.get_grid()
+        grid = evolve()
+        add("evolve_" + engine, evolve, grid.data.size)
+    data = grid.data
+    cells = data.size
+    add("classify", lambda: analysis.classify_automaton(Automaton(k, r, code, ic, steps, engine="lightcone"), steps), cells)
+    add("get_background", lambda: Grid(k, data).get_background(), cells)
+    add("remove_background", lambda: Grid(k, data).remove_background(), cells)
+    add("get_shape", lambda: analysis.get_shape(Grid(k, data)), cells)
+    foreground = Grid(k, data).remove_background()
+    shape = analysis.get_shape(foreground)
+    #The pattern checks are only reached by grids which grow into a 2D shape
+    if shape is not None:
+        add("check_simple_pattern", lambda: analysis.check_simple_pattern(foreground, shape), cells)
+        add("check_fractal", lambda: analysis.check_fractal(foreground, shape), cells)
+    add("analyse_grid", lambda: analysis.analyse_grid(Grid(k, data)), cells)
+    try:
+        import pygame
+        add("draw", lambda: Grid(k, data).draw(), cells)
+    except ImportError:
+        pass
+    with tempfile.TemporaryDirectory() as directory:
+        add("write_png", lambda: write_png(Grid(k, data), os.path.join(directory, "grid.png")), cells)
+    return stages
+
+#Times classify_chunk on a sweep workload in this process, returning its measurements
+def run_sweep_workload(k, r, first, count, ics, repeats):
+    codes = list(range(first, first + count))
+    seconds, peak = measure(lambda: classify_chunk(k, r, codes, ics), repeats)
+    return {"seconds": seconds, "rules_per_second": count / seconds, "automata_per_second": count * len(ics) / seconds, "peak_bytes": peak}
+
+#Runs every workload whose name contains the filter, returning the results in the form they are saved as
+def run_benchmarks(engines, repeats, name_filter=""):
+    results = {}
+    for workload in workloads:
+        name = workload_name(*workload)
+        if name_filter not in name:
+            continue
+        for stage, measurements in run_workload(*workload, engines, repeats).items():
+            results[name + "/" + stage] = measurements
+            print_result(name + "/" + stage, measurements)
+    for k, r, first, count, ics in sweep_workloads:
+        name = "sweep_k" + str(k) + "_r" + str(r) + "_" + str(first) + "+" + str(count) + "_ics" + str(len(ics))
+        if name_filter not in name:
+            continue
+        results[name] = run_sweep_workload(k, r, first, count, ics, repeats)
+        print_result(name, results[name])
+    return {"python": platform.python_version(), "numpy": np.__version__, "max_steps": analysis.max_steps, "results": results}
+
+def print_result(name, measurements):
+    line = name.ljust(56) + ("%.4f s" % measurements["seconds"]).rjust(12)
+    if measurements.get("cells_per_second"):
+        line += ("%.3g cells/s" % measurements["cells_per_second"]).rjust(20)
+    if "rules_per_second" in measurements:
+        line += ("%.3g rules/s" % measurements["rules_per_second"]).rjust(20)
+    line += ("%.1f MB peak" % (measurements["peak_bytes"] / 1e6)).rjust(16)
+    print(line)
+    sys.stdout.flush()
+
+#Compares the times of a run against a baseline, printing the ratio for every result found in both
+#Returns the names of the results which took more than threshold times as long as in the baseline
+def compare(results, baseline, threshold):
+    slower = []
+    for name, measurements in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = measurements["seconds"] / baseline["results"][name]["seconds"]
+        flag = ""
+        if ratio > threshold:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(name.ljust(56) + ("%.2fx" % ratio).rjust(10) + flag)
+    return slower
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each stage of running and classifying automata on fixed workloads")
+    parser.add_argument("--filter", default="", help="only run workloads whose name contains this text, such as _3000 or sweep")
+    parser.add_argument("--engines", nargs="+", default=["numpy", "lightcone"], help="engines to time evolving with (string is much slower on the long workloads)")
+    parser.add_argument("--repeats", type=int, default=3, help="number of times each stage is timed. The shortest time is kept")
+    parser.add_argument("--save", help="file to save the results to as JSON, to use as a baseline later")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio to the baseline's time above which a result counts as slower")
+    args = parser.parse_args()
+    results = run_benchmarks(args.engines, args.repeats, args.filter)
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(results, output, indent=1)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print("\nCompared with " + args.compare + ":")
+        slower = compare(results, baseline, args.threshold)
+        #A non-zero exit status lets scripts stop when something has become slower
+        if slower:
+            print(str(len(slower)) + " results were more than " + str(args.threshold) + " times slower than the baseline")
+            sys.exit(1)
@@ -0,0 +1,103 @@
+import argparse, json, os, sys, tempfile
+from ResultCache import ResultCache
+from Stats import Stats
+import analysis
+
+#Non-interactive interface to the analysis. Reads one query per line from stdin or from files, and writes one JSON record per query to stdout
+#A query is either a JSON object such as {"k": 2, "r": 1, "code": 30, "ic": "1"}, or the same four values separated by commas, such as 2,1,30,1
+#Every record is written as soon as its query is answered, so the results can be read while more queries are still being sent
+
+#Returns a field of a query as an integer. Only integers, or strings of one, are accepted, so 2.5 is an error rather than being read as 2
+def get_integer(value, name):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(name + " must be a whole number, not " + json.dumps(value))
+
+#Reads a query, returning (k, r, code, ic). Raises ValueError, KeyError or TypeError if the query isn't valid
+def parse_query(line):
+    if line.startswith("{"):
+        query = json.loads(line)
+        k, r, code, ic = query["k"], query["r"], query["code"], str(query["ic"])
+    else:
+        parts = [part.strip() for part in line.split(",")]
+        if len(parts) != 4:
+            raise ValueError("A query needs the number of states, radius, code and initial conditions separated by commas")
+        k, r, code, ic = parts
+    k, r, code = get_integer(k, "k"), get_integer(r, "r"), get_integer(code, "code")
+    #States are written as single digits, so there can be at most 10 of them
+    if not 2 <= k <= 10 or r < 1:
+        raise ValueError("k must be from 2 to 10 and r must be at least 1")
+    max_code = k**(k**(2*r+1)) - 1
+    if not 0 <= code <= max_code:
+        raise ValueError("The code must be from 0 to " + str(max_code))
+    if not ic or any(digit not in "0123456789"[:k] for digit in ic):
+        raise ValueError("The initial condition must be made of digits less than k")
+    return k, r, code, ic
+
+#Answers every query read from the lines of source, writing a record for each to output
+#A query which can't be read gives a record containing the query and the error instead of stopping the program
+#If a Stats object is given, the stats of every query are added to it
+#If directory is given, each automaton's steps are kept in a memory-mapped file in that directory instead of in memory.
+#   Every query gets its own file, which is deleted once the query is answered, so a grid still in use is never overwritten
+def run_queries(source, output, cache=None, steps=analysis.max_steps, fill_cutoff=analysis.fill_cutoff, spacing=analysis.sample_spacing, max_pattern=analysis.max_pattern, stats=None, directory=None):
+    query_stats = None
+    for line in source:
+        line = line.strip()
+        #Blank lines and lines starting with # are skipped, so query files can have comments
+        if not line or line.startswith("#"):
+            continue
+        try:
+            k, r, code, ic = parse_query(line)
+        except (ValueError, KeyError, TypeError) as error:
+            output.write(json.dumps({"query": line, "error": str(error)}) + "\n")
+            output.flush()
+            continue
+        if stats is not None:
+            query_stats = Stats()
+        path = None
+        if directory is not None:
+            handle, path = tempfile.mkstemp(suffix=".spacetime", dir=directory)
+            os.close(handle)
+        try:
+            result = analysis.run_automaton(k, r, code, ic, cache, steps, fill_cutoff, spacing, max_pattern, query_stats, path)[0]
+        finally:
+            #The grid is no longer referenced here, so its files can be removed
+            if path is not None:
+                for name in [path, path + ".foreground"]:
+                    if os.path.exists(name):
+                        os.remove(name)
+        if stats is not None:
+            stats.add(query_stats)
+        output.write(json.dumps({"k": k, "r": r, "max_steps": steps, "code": code, "ic": ic, "result": result}) + "\n")
+        output.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify automata read from stdin or files, writing a JSON record for each to stdout")
+    parser.add_argument("files", nargs="*", help="files of queries to read, in order (defaults to stdin, which can also be given as -)")
+    parser.add_argument("--max-steps", type=int, default=analysis.max_steps, help="number of steps each automaton is run for")
+    parser.add_argument("--fill-cutoff", type=int, default=analysis.fill_cutoff, help="most cells filled by each fill when checking for a fractal")
+    parser.add_argument("--spacing", type=int, default=analysis.sample_spacing, help="spacing of the points filled when checking for a fractal")
+    parser.add_argument("--max-pattern", type=int, nargs=2, default=analysis.max_pattern, metavar=("ROWS", "COLUMNS"), help="largest pattern checked for when looking for a simple repeating pattern")
+    parser.add_argument("--cache", help="SQLite file to cache results and grids in between runs")
+    parser.add_argument("--spacetime", help="directory to keep the steps of each automaton in while it is classified, so long runs don't need to fit in memory")
+    parser.add_argument("--profile", action="store_true", help="print the time spent in each stage and other counters to stderr once every query is answered")
+    args = parser.parse_args()
+    stats = Stats() if args.profile else None
+    cache = None
+    if args.cache:
+        cache = ResultCache(analysis.cache_version(args.fill_cutoff, args.spacing, tuple(args.max_pattern)), args.cache)
+    for name in args.files or ["-"]:
+        if name == "-":
+            run_queries(sys.stdin, sys.stdout, cache, args.max_steps, args.fill_cutoff, args.spacing, tuple(args.max_pattern), stats, args.spacetime)
+        else:
+            with open(name) as source:
+                run_queries(source, sys.stdout, cache, args.max_steps, args.fill_cutoff, args.spacing, tuple(args.max_pattern), stats, args.spacetime)
+    if cache is not None:
+        cache.close()
+    if stats is not None:
+        sys.stderr.write(stats.report() + "\n")
@@ -0,0 +1,42 @@
+import os, struct, zlib
+import numpy as np
+
+#Saves images of Grid objects as PNG files without needing pygame or a display, so images can be saved from worker processes
+
+#Builds one chunk of a PNG file: its length, type, data and checksum
+def png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xffffffff)
+
+#Writes a grid to a PNG file at path. Each cell becomes a scale by scale square of pixels
+#The image uses the grid's colours as its palette, so the cells are written straight into the file as palette indices, one byte per pixel
+#shrink keeps only every shrink-th step and cell, for saving small thumbnails of large grids
+def write_png(grid, path, scale=1, shrink=1):
+    cells = grid.data[::shrink, ::shrink]
+    if scale != 1:
+        cells = cells.repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width = cells.shape
+    #Every row of pixels starts with a filter type byte, which is 0 for no filtering
+    rows = np.zeros((height, width + 1), dtype=np.uint8)
+    rows[:, 1:] = cells
+    header = struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+    palette = bytes(channel for colour in grid.colours for channel in colour)
+    with open(path, "wb") as image:
+        image.write(b"\x89PNG\r\n\x1a\n")
+        image.write(png_chunk(b"IHDR", header))
+        image.write(png_chunk(b"PLTE", palette))
+        image.write(png_chunk(b"IDAT", zlib.compress(rows.tobytes())))
+        image.write(png_chunk(b"IEND", b""))
+
+#Creates a directory to write images to a file. Images are sorted based on the maximum number of steps and the initial condition
+def create_path(ic, steps):
+    #Creates each directory level as required. Several worker processes may create the same directory at once, so one that already exists is fine
+    image_path = "rules/max_" + str(steps) + "/" + ic
+    os.makedirs(image_path, exist_ok=True)
+    return image_path
+
+#Saves the image of an automaton into the rules/max_<steps>/<ic> directory used by create_path, named after k, r and the code
+#The number of steps is taken from the grid. Returns the path of the image
+def save_image(grid, k, r, code, ic, scale=1, shrink=1):
+    path = os.path.join(create_path(ic, grid.size[0]-1), str(k) + "_" + str(r) + "_" + str(code) + ".png")
+    write_png(grid, path, scale, shrink)
+    return path
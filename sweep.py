@@ -0,0 +1,214 @@
+import argparse, itertools, json, os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from Automaton import Automaton, get_rule_table, get_rule_tables
+from batch import iter_elementary_batch, iter_ic_batch
+from symmetry import class_members, shared_representative, source_ic
+from render import save_image
+from Stats import Stats
+from analysis import analyse_grid, behaviour_types, classify_automaton, generate_ics, max_steps
+
+#Classifies every code in a chunk on each of the initial conditions. This runs inside a worker process
+#Returns a list of records, one per code, in the same form they are written to the store
+#If images is True, an image of every grid is also saved with render.save_image, keeping every shrink-th step and cell
+#If a Stats object is given, the stats of every automaton are added to it
+def classify_chunk(k, r, codes, ics, images=False, shrink=1, stats=None):
+    records = []
+    automaton_stats = None
+    if k == 2 and r == 1:
+        #Elementary automata can all be evolved together with the bit-packed batch simulator
+        runs = len(codes) * len(ics)
+        grids = iter_elementary_batch([(code, ic) for code in codes for ic in ics], max_steps, 256)
+        #batch_sizes is the number of grids in each batch the simulator evolves at once, in order
+        batch_sizes = [min(256, runs - i) for i in range(0, runs, 256)]
+    else:
+        #A chunk of consecutive codes has all of its rule tables made at once, and each table is shared by all of the code's initial conditions
+        if codes[-1] - codes[0] == len(codes) - 1:
+            tables = get_rule_tables(k, r, codes[0], codes[-1] + 1)
+        else:
+            tables = [get_rule_table(k, r, code) for code in codes]
+        if len(ics) == 1:
+            #With a single initial condition there is nothing to evolve together, so each automaton is run on its own, stopping early if it repeats
+            for code, table in zip(codes, tables):
+                rule = Automaton(k, r, code, ics[0], max_steps, engine="lightcone", table=table)
+                if stats is not None:
+                    automaton_stats = Stats()
+                results = {ics[0]: classify_automaton(rule, stats=automaton_stats)}
+                if stats is not None:
+                    stats.add(automaton_stats)
+                if images:
+                    save_image(rule.get_grid(), k, r, code, ics[0], shrink=shrink)
+                records.append({"k": k, "r": r, "max_steps": max_steps, "code": code, "results": results})
+            return records
+        #Otherwise all of the initial conditions of each code are evolved together
+        grids = itertools.chain.from_iterable(iter_ic_batch(k, r, code, ics, max_steps, 64, table) for code, table in zip(codes, tables))
+        batch_sizes = [min(64, len(ics) - i) for i in range(0, len(ics), 64)] * len(codes)
+    #Every grid of a batch is evolved at once when the first one is asked for, so each batch is taken whole and timed once,
+    #   and its time is shared equally between its automata
+    batch_sizes = iter(batch_sizes)
+    batch = []
+    for code in codes:
+        results = {}
+        for ic in ics:
+            if not batch:
+                start = Stats.start()
+                batch = [next(grids) for i in range(next(batch_sizes))]
+                batch.reverse()
+                share = (Stats.start() - start) / len(batch)
+                if stats is not None:
+                    stats.count("evolve_batches")
+            grid = batch.pop()
+            if stats is not None:
+                automaton_stats = Stats()
+                #The batches evolve every step, without looking for cycles
+                automaton_stats.times["evolve"] = share
+                automaton_stats.count("steps_evolved", max_steps)
+            results[ic] = analyse_grid(grid, stats=automaton_stats)
+            if stats is not None:
+                stats.add(automaton_stats)
+            if images:
+                save_image(grid, k, r, code, ic, shrink=shrink)
+        records.append({"k": k, "r": r, "max_steps": max_steps, "code": code, "results": results})
+    return records
+
+#Runs classify_chunk with a new Stats object, returning the records and the stats. Used by sweep to collect stats from its worker processes
+def profile_chunk(k, r, codes, ics, images=False, shrink=1):
+    stats = Stats()
+    return classify_chunk(k, r, codes, ics, images, shrink, stats), stats
+
+#Reads the results already in the store, returning a dictionary of code to results for the requested k and r
+#Each line of the store is one JSON record. A line which was cut off by an interruption is skipped
+def load_store(path, k, r):
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as store:
+        for line in store:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record["k"] != k or record["r"] != r or record["max_steps"] != max_steps:
+                continue
+            #Records copied from a representative before only exact permutations were used may be wrong, so those codes are run again
+            if "representative" in record and "permutation" not in record:
+                continue
+            results.setdefault(record["code"], {}).update(record["results"])
+    return results
+
+#Classifies each code in codes on each of the initial conditions, spreading chunks of chunk_size codes over a pool of worker processes
+#Every finished chunk is appended to the store at path straight away, and codes found in the store already are skipped,
+#   so an interrupted sweep continues from where it stopped when it is run again
+#If symmetry is True, codes are only run if their results can't be copied from another code, as found by symmetry.shared_representative.
+#   A code which is a permutation of its representative behaves like the representative does on the initial condition with the permutation undone,
+#   so the representative is run on those initial conditions as well, and each result is copied from the matching one
+#images and shrink are passed on to classify_chunk, to save an image of every automaton which is run
+#If a Stats object is given, the stats of every automaton which is run are added to it, including its histograms
+#Returns a dictionary of code to a dictionary of initial condition to behaviour type
+def sweep(k, r, codes, ics, path, workers=None, chunk_size=64, symmetry=False, images=False, shrink=1, stats=None):
+    workers = workers or os.cpu_count()
+    results = load_store(path, k, r)
+    def is_complete(code, needed=ics):
+        return all(ic in results.get(code, {}) for ic in needed)
+    representatives = {}
+    #needed holds the initial conditions each code is run on, if they aren't just ics, and transforms holds the (state_map, reflect)
+    #   which turns each code's representative into it
+    needed = {}
+    transforms = {}
+    if symmetry:
+        representatives = {code: shared_representative(k, r, code) for code in codes if not is_complete(code)}
+        groups = {}
+        for code, representative in representatives.items():
+            if code == representative:
+                code_ics = ics
+            else:
+                if representative not in groups:
+                    groups[representative] = class_members(k, r, representative, reflections=False, fixed_zero=True)
+                transforms[code] = groups[representative][code]
+                code_ics = [source_ic(ic, *transforms[code]) for ic in ics]
+            needed[representative] = list(dict.fromkeys(needed.get(representative, []) + code_ics))
+        to_run = list(needed)
+    else:
+        to_run = codes
+    remaining = [code for code in to_run if not is_complete(code, needed.get(code, ics))]
+    #Every chunk is a list of codes which are run on the same initial conditions
+    by_ics = {}
+    for code in remaining:
+        by_ics.setdefault(tuple(needed.get(code, ics)), []).append(code)
+    chunks = [(group[i:i+chunk_size], list(chunk_ics)) for chunk_ics, group in by_ics.items() for i in range(0, len(group), chunk_size)]
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    #If the last record was only partly written, start on a new line so the next record isn't joined onto it
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "rb") as store:
+            store.seek(-1, os.SEEK_END)
+            needs_newline = store.read(1) != b"\n"
+    else:
+        needs_newline = False
+    with open(path, "a") as store, ProcessPoolExecutor(workers) as pool:
+        if needs_newline:
+            store.write("\n")
+        #Only a few chunks are submitted at a time, so a sweep over millions of codes doesn't queue millions of tasks up front
+        in_flight = set()
+        next_chunk = 0
+        while next_chunk < len(chunks) or in_flight:
+            while next_chunk < len(chunks) and len(in_flight) < workers * 4:
+                chunk_codes, chunk_ics = chunks[next_chunk]
+                in_flight.add(pool.submit(classify_chunk if stats is None else profile_chunk, k, r, chunk_codes, chunk_ics, images, shrink))
+                next_chunk += 1
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                records = future.result()
+                if stats is not None:
+                    records, chunk_stats = records
+                    stats.merge(chunk_stats)
+                for record in records:
+                    store.write(json.dumps(record) + "\n")
+                    results.setdefault(record["code"], {}).update(record["results"])
+                store.flush()
+        #The other members of each class are stored too, so they are skipped if the sweep is resumed
+        for code, representative in representatives.items():
+            if code != representative:
+                state_map, reflect = transforms[code]
+                copied = {ic: results[representative][source_ic(ic, state_map, reflect)] for ic in ics}
+                record = {"k": k, "r": r, "max_steps": max_steps, "code": code, "results": copied, "representative": representative, "permutation": state_map.tolist()}
+                store.write(json.dumps(record) + "\n")
+                results.setdefault(code, {}).update(record["results"])
+        store.flush()
+    #Representatives may also have results for other initial conditions, which aren't returned
+    return {code: {ic: results[code][ic] for ic in ics} for code in codes}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify a range of automaton codes without using the interactive prompt")
+    parser.add_argument("k", type=int, help="number of states")
+    parser.add_argument("r", type=int, help="radius of neighbourhood")
+    parser.add_argument("first", type=int, help="first code to classify")
+    parser.add_argument("last", type=int, help="last code to classify (inclusive)")
+    parser.add_argument("--ics", nargs="+", help="initial conditions to run each code on (defaults to \"1\")")
+    parser.add_argument("--ic-size", type=int, help="run every initial condition of this size or less instead of --ics")
+    parser.add_argument("--store", help="file the results are written to and resumed from")
+    parser.add_argument("--workers", type=int, help="number of worker processes (defaults to the number of cores)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="number of codes given to a worker at a time")
+    parser.add_argument("--symmetry", action="store_true", help="copy results between codes which are permutations of the nonzero states of each other, instead of running them all")
+    parser.add_argument("--images", action="store_true", help="save an image of every automaton run into rules/max_<steps>/<ic>")
+    parser.add_argument("--shrink", type=int, default=1, help="only keep every n-th step and cell in saved images, to save thumbnails")
+    parser.add_argument("--profile", action="store_true", help="print the time spent in each stage and other counters, with a histogram of each")
+    args = parser.parse_args()
+    if args.ic_size:
+        ics = generate_ics(args.k, args.ic_size)
+    else:
+        ics = args.ics or ["1"]
+    path = args.store or "sweeps/k" + str(args.k) + "_r" + str(args.r) + "_max" + str(max_steps) + ".jsonl"
+    stats = Stats() if args.profile else None
+    results = sweep(args.k, args.r, range(args.first, args.last+1), ics, path, args.workers, args.chunk_size, args.symmetry, args.images, args.shrink, stats)
+    #Total up how often each behaviour occurred across the whole sweep
+    count = [0] * len(behaviour_types)
+    for code in results:
+        for ic in ics:
+            count[results[code][ic]] += 1
+    print("Classified " + str(len(results)) + " codes on " + str(len(ics)) + " initial conditions. Results are in " + path)
+    for i in range(len(behaviour_types)):
+        print(behaviour_types[i] + " This occurred " + str(count[i]) + " times.")
+    if stats is not None:
+        print()
+        print(stats.report())
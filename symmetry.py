@@ -0,0 +1,77 @@
+import itertools
+import numpy as np
+from Automaton import get_rule_table
+
+#Rules related by a left-right reflection, a permutation of the states, or both, behave identically up to mirroring or recolouring
+#This module finds the equivalence class of a code under those symmetries, and the representative of the class, which is its smallest code
+#A transformed rule only behaves like the original on a transformed initial condition, so results can't always be shared between the members of a class.
+#   See shared_representative for the classes whose results can be
+
+#Converts a rule table from get_rule_table back into its code
+def get_code(k, table):
+    code = 0
+    for state in table[::-1].tolist():
+        code = code * k + state
+    return code
+
+#transforms stores the transforms already produced for each (k, r, reflections, permutations, fixed_zero)
+transforms = {}
+
+#Returns every transform in the symmetry group as a tuple of (neighbourhood_map, state_map, reflect)
+#A transform moves the entry for neighbourhood n to neighbourhood_map[n], and changes its state s to state_map[s]. reflect is True if it mirrors the rule
+#If fixed_zero is True, only the permutations which leave state 0 alone are included
+def get_transforms(k, r, reflections=True, permutations=True, fixed_zero=False):
+    key = (k, r, reflections, permutations, fixed_zero)
+    if key not in transforms:
+        size = 2*r+1
+        #The digits of every neighbourhood, with the leftmost cell first
+        digits = np.array(list(itertools.product(range(k), repeat=size)), dtype=np.intp)
+        weights = k ** np.arange(size-1, -1, -1)
+        state_maps = [np.array(p, dtype=np.intp) for p in itertools.permutations(range(k))] if permutations else [np.arange(k)]
+        if fixed_zero:
+            state_maps = [state_map for state_map in state_maps if state_map[0] == 0]
+        group = []
+        for state_map in state_maps:
+            for reflect in ([False, True] if reflections else [False]):
+                #Recolour every cell of the neighbourhood, then reverse the order of the cells if reflecting
+                moved = state_map[digits]
+                if reflect:
+                    moved = moved[:, ::-1]
+                group.append((moved @ weights, state_map, reflect))
+        transforms[key] = group
+    return transforms[key]
+
+#Returns a dictionary of every code in the equivalence class of the given code, to the (state_map, reflect) of a transform which turns the given code into it
+def class_members(k, r, code, reflections=True, permutations=True, fixed_zero=False):
+    table = get_rule_table(k, r, code)
+    members = {}
+    for neighbourhood_map, state_map, reflect in get_transforms(k, r, reflections, permutations, fixed_zero):
+        new_table = np.empty_like(table)
+        new_table[neighbourhood_map] = state_map[table]
+        members.setdefault(get_code(k, new_table), (state_map, reflect))
+    return members
+
+#Returns every code in the equivalence class of the given code, in ascending order
+def equivalence_class(k, r, code, reflections=True, permutations=True, fixed_zero=False):
+    return sorted(class_members(k, r, code, reflections, permutations, fixed_zero))
+
+#Returns the representative of the equivalence class of the given code
+def canonical(k, r, code, reflections=True, permutations=True, fixed_zero=False):
+    return equivalence_class(k, r, code, reflections, permutations, fixed_zero)[0]
+
+#Returns the initial condition a code must be run on to behave as the transformed code does on ic
+#If a code evolves x into y, the transformed code evolves the transformed x into the transformed y, so this undoes the transform on ic
+def source_ic(ic, state_map, reflect):
+    inverse = np.argsort(state_map)
+    ic = "".join(str(inverse[int(digit)]) for digit in ic)
+    return ic[::-1] if reflect else ic
+
+#Returns the representative whose results can be copied exactly to the given code by sweep, or the code itself if there isn't one
+#The padding around every initial condition is state 0, so only permutations which leave 0 alone turn one run into another.
+#   Even then, the classification only gives the same result for the two grids if the background stays 0, because the background is
+#   subtracted from each step before the checks are made. Reflections are never used, since the checks aren't symmetric:
+#   rule 169 on 10101 is the mirror image of rule 225 on 10101, but they are classified differently
+def shared_representative(k, r, code):
+    if get_rule_table(k, r, code)[0] != 0:
+        return code
+    return canonical(k, r, code, reflections=False, fixed_zero=True)